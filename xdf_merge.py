@@ -11,14 +11,43 @@ XDF → Excel + JSON exporter
     <input>.embedded.json → raw EmbeddedData JSON dump
 """
 
-import xml.etree.ElementTree as ET
+from lxml import etree as ET
 from pathlib import Path
 import pandas as pd
+import xlsxwriter
 import json
+import csv
 import sys
 import random
 import pprint
 import math
+import ast
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from types import MappingProxyType
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+def json_dumps(obj):
+    """Indented UTF-8 JSON bytes; orjson when available, else the stdlib."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+
+json_loads = orjson.loads if orjson is not None else json.loads
+
+def json_dump_array(items, f):
+    """Write items to binary file f as an indented JSON array, one item at a time."""
+    # Same bytes as json_dumps(list(items)), without holding the whole document
+    sep = b"[\n  "
+    for item in items:
+        f.write(sep + json_dumps(item).replace(b"\n", b"\n  "))
+        sep = b",\n  "
+    f.write(b"[]" if sep == b"[\n  " else b"\n]")
 
 #Memory Address vs. Input Type
 #3 -  shared register
@@ -31,45 +60,115 @@ import math
 #49 - load
 #4d - Unknown - used only by table at memory address 0x158E
 
-max_table=256
+# Source label per input type byte of a variable map
+_SRC_LABELS = {
+    0x03: "Engine Temp", 0x11: "Battery Voltage", 0x12: "Air Temp",
+    0x13: "Coolant Temp", 0x37: "RPM", 0x49: "Engine Load",
+}
+
+# parsed workbook streams rows to disk; cell text is never turned into links/formulas
+_EXCEL_OPTIONS = {"constant_memory": True, "strings_to_urls": False, "strings_to_formulas": False}
+
+# only these columns can hold multi-line text (serialized JSON or free-form descriptions)
+_WRAP_COLUMNS = frozenset({"Category", "CategoryMem", "Labels", "DALINK", "Math_Table", "Description"})
+
+# dict/list fields kept as Python objects in the rows, pretty-printed as JSON only in the workbook
+_JSON_TEXT_COLUMNS = frozenset({"Category", "Labels", "DALINK"})
+
+# columns of the flattened JSON workbook
+_JSON_COLUMNS = ("ObjectType", "Title", "Parent", "Field", "Key", "Value")
+
+# hex() text for every byte value, so byte dumps are a table lookup
+_HEX = [hex(i) for i in range(256)]
 
 # ---------------------------
 # Lookup Maps
 # ---------------------------
-UNITTYPE_MAP = {
-    "0": "Generic", "1": "Temperature", "2": "Pressure", "3": "Time",
-    "4": "Angle", "5": "Ratio", "6": "Voltage", "7": "Percent",
-    "8": "RPM", "9": "Mass", "10": "Flow", "11": "Distance",
-    "12": "Speed", "13": "Current", "14": "Frequency",
-}
+# indexed by the numeric XDF code
+UNITTYPE_NAMES = (
+    "Generic", "Temperature", "Pressure", "Time",
+    "Angle", "Ratio", "Voltage", "Percent",
+    "RPM", "Mass", "Flow", "Distance",
+    "Speed", "Current", "Frequency",
+)
 
-OUTPUTTYPE_MAP = {
-    "0": "Unsigned", "1": "Signed", "2": "Hex", "3": "ASCII", "4": "Enum/String",
-}
+OUTPUTTYPE_NAMES = ("Unsigned", "Signed", "Hex", "ASCII", "Enum/String")
+
+# ---------------------------
+# Compiled XPath queries
+# ---------------------------
+_XP_AXES = ET.XPath("XDFAXIS")
+_XP_MATH = ET.XPath(".//MATH")
+# plain str results: lxml "smart strings" would keep each VAR (and its axis) alive
+_XP_VAR_ID = ET.XPath("VAR/@id", smart_strings=False)
+_XP_LABELS = ET.XPath("LABEL")
+_XP_DALINKS = ET.XPath("DALINK")
+_XP_CATEGORIES = ET.XPath("CATEGORY")
+_XP_CATEGORYMEMS = ET.XPath("CATEGORYMEM")
 
 # ---------------------------
 # Helpers
 # ---------------------------
 
-def eval_formula(formula: str, **variables):
-    # Allow safe built-ins from math
-    allowed_names = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
-    # Add user variables
-    allowed_names.update(variables)
-    # Evaluate safely
-    return eval(formula, {"__builtins__": None}, allowed_names)
+# Safe built-ins from math, built once
+_MATH_NS = {k: v for k, v in math.__dict__.items() if not k.startswith("__")}
+
+# AST nodes an XDF equation may contain: arithmetic/comparisons on names, numbers and function calls
+_FORMULA_NODES = (
+    ast.Expression, ast.Constant, ast.Name, ast.Load, ast.Call,
+    ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+    ast.operator, ast.unaryop, ast.boolop, ast.cmpop,
+)
+
+def _validate_formula(tree):
+    for node in ast.walk(tree):
+        if not isinstance(node, _FORMULA_NODES):
+            raise ValueError(f"Unsupported {type(node).__name__} in equation")
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+            raise ValueError("Only plain function calls are allowed in equations")
+        if isinstance(node, ast.Name) and node.id.startswith("_"):
+            raise ValueError(f"Name {node.id!r} is not allowed in equations")
+
+@functools.lru_cache(maxsize=4096)
+def _compile_formula(src: str):
+    # Parse, allow-list and compile each distinct equation once, not once per value
+    tree = ast.parse(src, mode="eval")
+    _validate_formula(tree)
+    return compile(tree, "<xdf>", "eval")
+
+@functools.lru_cache(maxsize=4096)
+def _formula_callable(src: str):
+    # f(x) evaluating the equation with X bound to x; namespaces are built once per equation
+    code = _compile_formula(src)
+    namespace = {"__builtins__": None, **_MATH_NS}
+    return lambda x: eval(code, namespace, {"X": x})
+
+def _code_name(raw, names):
+    # Name for a canonical code string ("0", "14", ...); anything else comes back as-is
+    if raw.isdecimal() and str(idx := int(raw)) == raw and idx < len(names):
+        return names[idx]
+    return raw
+
+# Only a handful of distinct codes ever show up, so the (raw, name) pair is cached per input string
+@functools.lru_cache(maxsize=64)
+def _normalize_unittype(value):
+    raw = value.strip()
+    return raw, _code_name(raw, UNITTYPE_NAMES)
+
+@functools.lru_cache(maxsize=64)
+def _normalize_outputtype(value):
+    raw = value.strip()
+    return raw, _code_name(raw, OUTPUTTYPE_NAMES)
 
 def normalize_unittype(value):
     if not value:
         return None, None
-    raw = value.strip()
-    return raw, UNITTYPE_MAP.get(raw, raw)
+    return _normalize_unittype(value)
 
 def normalize_outputtype(value):
     if not value:
         return None, None
-    raw = value.strip()
-    return raw, OUTPUTTYPE_MAP.get(raw, raw)
+    return _normalize_outputtype(value)
 
 def _cast_int(val):
     try:
@@ -83,19 +182,30 @@ def _cast_hex(val):
     except Exception:
         return None
 
-def _extract_embedded(elem):
-    ed = elem.find("EMBEDDEDDATA")
+@dataclass(slots=True)
+class Embedded:
+    """Casted <EMBEDDEDDATA> attributes; all None when the element is missing."""
+    element_size_bits: int | None = None
+    major_stride_bits: int | None = None
+    minor_stride_bits: int | None = None
+    row_count: int | None = None
+    col_count: int | None = None
+    address: int | None = None
+    type_flags: int | None = None
+
+def _extract_embedded(ed):
     if ed is None:
-        return {"mmedelementsizebits": None, "mmedmajorstridebits": None, "mmedminorstridebits": None, "mmedrowcount": None, "mmedcolcount": None,"mmedaddress": None, "mmedtypeflags": None}
-    return {
-        "mmedelementsizebits": _cast_int(ed.get("mmedelementsizebits")),
-        "mmedmajorstridebits": _cast_int(ed.get("mmedmajorstridebits")),
-        "mmedminorstridebits": _cast_int(ed.get("mmedminorstridebits")),
-        "mmedrowcount": _cast_int(ed.get("mmedrowcount")),
-        "mmedcolcount": _cast_int(ed.get("mmedcolcount")),
-        "mmedaddress": _cast_hex(ed.get("mmedaddress")),
-        "mmedtypeflags": _cast_hex(ed.get("mmedtypeflags"))
-    }
+        return Embedded()
+    a = ed.attrib
+    return Embedded(
+        _cast_int(a.get("mmedelementsizebits")),
+        _cast_int(a.get("mmedmajorstridebits")),
+        _cast_int(a.get("mmedminorstridebits")),
+        _cast_int(a.get("mmedrowcount")),
+        _cast_int(a.get("mmedcolcount")),
+        _cast_hex(a.get("mmedaddress")),
+        _cast_hex(a.get("mmedtypeflags")),
+    )
 def _extract_base_offset (bo):
 # <BASEOFFSET offset="4096" subtract="0" />
   boff = bo.find("BASEOFFSET")
@@ -136,23 +246,20 @@ def _extract_region (reg):
              "desc": regs.get("desc")
          }
 
-def _extract_math(elem):
-    math_elem = elem.find(".//MATH")
-    equation = math_elem.get("equation") if math_elem is not None else None
-    return equation
-
-def _extract_math_table(elem):
-    #tree = ET.parse(xml_path)
-    #root = tree.getroot()
+def _extract_all_math(elem):
+    """One MATH walk per element: (first VAR id, first equation, all MATH entries)."""
+    maths = _XP_MATH(elem)
+    if not maths:
+        return None, None, []
 
     # Collect all MATH entries with attributes
     math_entries = []
-    for m in elem.findall(".//MATH"):
+    for m in maths:
         eq = m.attrib.get("equation", "")
         row = m.attrib.get("row")
         col = m.attrib.get("col")
-        var_elem = m.find("VAR")
-        var_id = var_elem.attrib.get("id") if var_elem is not None else None
+        var_ids = _XP_VAR_ID(m)
+        var_id = var_ids[0] if var_ids else None
 
         math_entries.append({
             "row": int(row) if row else None,
@@ -160,17 +267,22 @@ def _extract_math_table(elem):
             "equation": eq,
             "var": var_id
         })
-    return math_entries
-
-
 
-def _extract_varid(elem):
-    axis_id = elem.get("id")
-    math_elem = elem.find(".//MATH")
-    var_elem = math_elem.find(".//VAR") if math_elem is not None else None
-    var_id = var_elem.get("id") if var_elem is not None else None
-    equation = math_elem.get("equation") if math_elem is not None else None
-    return var_id
+    first = math_entries[0]
+    return first["var"], maths[0].get("equation"), math_entries
+
+def _children(elem):
+    # One pass over the children: tag -> text of the first child with that tag
+    # (as findtext() would return it), plus the first <EMBEDDEDDATA> element
+    texts = {}
+    ed = None
+    for c in elem:
+        tag = c.tag
+        if tag not in texts:
+            texts[tag] = c.text or ""
+            if tag == "EMBEDDEDDATA":
+                ed = c
+    return texts, ed
 
 def serialize_field(value):
     """Pretty-print dicts/lists as JSON, leave scalars as-is."""
@@ -178,205 +290,210 @@ def serialize_field(value):
         return json.dumps(value, ensure_ascii=False, indent=2)
     return value
 
+def excel_cell(value):
+    """Convert a row value to something xlsxwriter can write, as pandas' to_excel would."""
+    if isinstance(value, (list, dict, tuple)):
+        return str(value)
+    if pd.isna(value):
+        return None
+    return value
+
 def ReadJSONMap(infile):
-    with open(infile, 'r') as file:
-      data = json.load(file)
+    with open(infile, 'rb') as file:
+      data = json_loads(file.read())
     return data
 
-def find_size(xdf_def,addr):
-   axes=xdf_def.get("Axes", [])
+def _build_map_index(map_def):
+   # XDF mmedaddr -> (Map Values, Header Values); first record wins, as the old linear scan did
+   by_addr={}
+   for rec in map_def:
+     by_addr.setdefault(int(rec["XDF mmedaddr"],16), (rec["Map Values"], rec["Header Values"]))
+   # same records keyed 4096 lower, for XDF addresses relative to the bin base offset
+   by_addr_plus_4096={a-4096: v for a, v in by_addr.items()}
+   return by_addr, by_addr_plus_4096
+
+def _build_z_index(axes):
+   # z axes with an embedded address, keyed by the int address; first axis wins
+   z_by_addr={}
    for rec in axes:
      if ((rec["ID"] =="z") and (rec["Embedded.Address"] != None)):
-       if rec["Embedded.Address"] == addr:
-           if rec["Embedded.Rowcount"]==None:return rec["Embedded.Colcount"]
-           elif rec["Embedded.Colcount"] == None: return rec["Embedded.Rowcount"]
-           else:
-             return(rec["Embedded.Rowcount"] * rec["Embedded.Rowcount"])
-   return None
+       z_by_addr.setdefault(int(rec["Embedded.Address"],16), rec)
+   return z_by_addr
 
+def find_size(z_by_addr,addr):
+   rec=z_by_addr.get(addr)
+   if rec is None: return None
+   if rec["Embedded.Rowcount"]==None:return rec["Embedded.Colcount"]
+   elif rec["Embedded.Colcount"] == None: return rec["Embedded.Rowcount"]
+   else:
+     return(rec["Embedded.Rowcount"] * rec["Embedded.Colcount"])
 
-def find_val(map_def,val):
-   for rec in map_def:
-     if int(rec["XDF mmedaddr"],16)==val:  
-       return rec["Map Values"]
-   return None
 
-def find_hdr(map_def,val):
-   for rec in map_def:
-     if int(rec["XDF mmedaddr"],16)==val:  
-       return rec["Header Values"]
-   return None
+def find_val(map_index,val):
+   return map_index.get(val, (None, None))[0]
+
+def find_hdr(map_index,val):
+   return map_index.get(val, (None, None))[1]
 
 def find_result(vals,math):
    result=[]
    if vals == None: return result 
+   f=_formula_callable(math.upper())
    for rec in vals:
       if rec == None: return None
-      if type(rec) is int: res=eval_formula(math.upper(),X=rec)
-      else: res=eval_formula(math.upper(),X=int(rec,16))
+      if type(rec) is int: res=f(rec)
+      else: res=f(int(rec,16))
       result.append(res)
    return result
      
+# Results already computed, keyed by (values, equations)
+_result_cache: dict[tuple, list] = {}
+
 def find_result_table(vals,math_table):
-   result=[]
-   res={"result":None, "row":None, "col":None}
-   if ((vals == []) or (vals==None) or (math_table==None) or (math_table==[])): return result 
+   if ((vals == []) or (vals==None) or (math_table==None) or (math_table==[])): return []
+   key = (tuple(vals), tuple((m["equation"], m["row"], m["col"]) for m in math_table))
+   if key not in _result_cache:
+      _result_cache[key] = _eval_result_table(vals, math_table)
+   return _result_cache[key]
+
+def _eval_result_table(vals,math_table):
    if len(math_table)==1:
-#single equation
-     math=math_table[0]
-     for vrec in vals:
-       if vrec == None: return None
-       if type(vrec) is int:
-         res["result"]==eval_formula(math["equation"].upper(),X=vrec)
-       else:
-         res["result"]==eval_formula(math["equation"].upper(),X=int(vrec,16))
-       res["col"]=None
-       res["row"]=None
-       result.append(res)
-     return result
-
-#table of math equations
-   for i in range(1,len(math_table)):
-     math=math_table[i]
-     vrec=vals[i-1]
-     if vrec == None: return None
-     res={}
-     if type(vrec) is int:
-       res["result"] = eval_formula(math["equation"].upper(),X=vrec)
-     else:
-       res["result"] = eval_formula(math["equation"].upper(),X=int(vrec,16))
-     res["col"]=math["col"]
-     res["row"]=math["row"]
-     result.append(res)
-   return result
+#single equation, applied to every value
+     f=_formula_callable(math_table[0]["equation"].upper())
+     cells=[(f, None, None, vrec) for vrec in vals]
+   else:
+#table of math equations, one per value
+     cells=[(_formula_callable(m["equation"].upper()), m["row"], m["col"], vrec) for m, vrec in zip(math_table[1:], vals)]
+   # a missing value invalidates the whole table; bail out before evaluating anything
+   if any(vrec is None for *_, vrec in cells): return None
+   return [{"result": f(vrec if isinstance(vrec, int) else int(vrec,16)), "row": row, "col": col}
+           for f, row, col, vrec in cells]
      
 
-def find_map_addr_in_xdf(xdf_def, addr):	
-   axes = xdf_def.get("Axes", [])
-   for rec in axes:
-     if ((rec["ID"] =="z") and (rec["Embedded.Address"] != None)): 
-       if int(rec["Embedded.Address"],16) == int(addr,16): 
-           return addr 
-   return None 
+def find_map_addr_in_xdf(z_by_addr, addr):
+   if addr in z_by_addr:
+       return addr
+   return None
 
 def lookup_val(bindata,addr,size):
-   if len(bindata)==8192: addri=int(addr,16)
-   else: addri=int(addr,16)-4096
-   raw_val=list(bindata[addri:addri+size])
-   hex_values=[]
-   for v in range(size):
-       hex_values.append(hex(raw_val[v]))
-   return(hex_values)
-
-
-def new_unique_table_id(xdf_def): 
-    tables=xdf_def.get("Tables")
-    match=True
-    while(match==True):
-       rand_id=hex(random.getrandbits(16))
-       match=False
-       for table in tables:
-         table_id=table.get("UniqueID")
-         match=(table_id==rand_id.upper())
-         if match:
-            print("dupe")
-            match=True
-            break
-    return(rand_id)    
+   if len(bindata)==8192: addri=addr
+   else: addri=addr-4096
+   return [_HEX[b] for b in bindata[addri:addri+size]]
+
+
+def new_unique_table_id(existing_ids):
+    # existing_ids is a set of UniqueIDs in use; the new ID is added to it
+    while True:
+       rand_id=f"0x{random.getrandbits(16):X}"
+       if rand_id in existing_ids:
+          print("dupe")
+          continue
+       existing_ids.add(rand_id)
+       return(rand_id)
 
 def extract_values_from_bin(map_file):
-  data=[]
-  with open(map_file, "r") as ex_f:
-        for line in ex_f:
-            # Strip whitespace and skip empty lines
-            line = line.strip()
-            if not line:
-                continue
-
-            # Split into label and hex value
-            if "," in line:
-                entry_type,descr, addr = line.split(",", 2)
-                entry_type = entry_type.strip('"')
-                descr = descr.strip('"')
-                addr = addr.strip('"')
-                if entry_type=="MAP": data.append({"Address":addr, "Type":"MemoryRefMap", "Title":descr})
-                else: data.append({"Address":addr, "Type":"FixedMap", "Title":descr})
+  with open(map_file, "r", newline="") as ex_f:
+        # "TYPE","label","0xADDR" rows; blank and short lines are skipped
+        rows = (row for row in csv.reader(ex_f) if len(row) >= 3)
+        data = [{"Address":addr.strip(), "AddrInt":int(addr,16),
+                 "Type":"MemoryRefMap" if entry_type.strip()=="MAP" else "FixedMap", "Title":descr}
+                for entry_type, descr, addr, *_ in rows]
 
   data[0]["Type"]="Start"
   data[0]["Description"]="Start of Maps"
 
   return data
 
-def merge_data(bin_file,map_file):
+def merge_data(bin_file,map_file,bindata=None):
 
   out_def=[]
-  with open(bin_file, "rb") as f:
-    bindata = f.read()
-    with open(map_file, 'r') as file:
-       map = json.load(file)
-    print("# of Maps",len(map)-1,"Size of Bin FIle",len(bindata))
-    print("map table starting address:",map[0]["Address"])
-    for addr_index in range(1,len(map)):
-        addr=int(map[addr_index]["Address"],16)
-        MapType=map[addr_index]["Type"]
-        hex_values=[]
-        if addr<0x2000:
-             if (len(bindata)==8192 and (addr>0x100) and MapType!="FixedMap"):
-                if len(bindata)==8192: fixaddr=addr
-                else: fixaddr=addr-4096
-                raw_values = list(bindata[fixaddr:fixaddr+2*max_table+2])  # 3 bytes
-                size=raw_values[1]
-                #XDF_mapaddr = hex(addr+size+2)
-                XDF_mapaddr = hex(addr+size+2-4096)
-                hex_values=list()
-                for v in range(2*size+2):
-                  hex_values.append(hex(raw_values[v]))
-                headers  = [str(v) for v in hex_values[2:size+2]]
-                map_vals = [str(v) for v in hex_values[size+2:size*2+2]]
-                match raw_values[0]:
-                   case 0x3:  msg="Engine Temp"
-                   case 0x11: msg="Battery Voltage"
-                   case 0x12: msg="Air Temp"
-                   case 0x13: msg="Coolant Temp"
-                   case 0x37: msg="RPM"
-                   case 0x49: msg="Engine Load"
-                   case _:    msg=hex_values[0]
-             else:
-                if len(bindata)==8192: fixaddr=addr+4096
-                else: fixaddr=addr
-                raw_values = list()
-                raw_values.append(hex(0))  #set address and size=0
-                raw_values.append(hex(0))
-                hex_values=list()
-                hex_values.append(hex(0))
-                hex_values.append(hex(0))
-                XDF_mapaddr = hex(fixaddr)
-                size=0 # need to find the size from XDF and then extract from bin
-                headers=[]
-                map_vals=[] # need to find the size from XDF and then extract from bin
-                msg=hex(0)
-             #print("debug", XDF_mapaddr, fixaddr, len(bindata),MapType, "raw",raw_values[2:2*size+2],"hex",hex_values)
-
-             out = {
-                   "Addr"         :  map[addr_index]["Address"],
-                   "MapType"      :  map[addr_index]["Type"],
-                   "Title"        :  map[addr_index]["Title"],
-                   "Source"       :  msg,
-                   "XDF mmedaddr" :  XDF_mapaddr,
-                   "Source"       :  hex_values[0],
-                   "Size"         :  hex_values[1],
-                   "Header Values": headers,
-                   "Map Values"   : map_vals
-                   }
-
-             out_def.append(out)
-             #print("Addr",map[addr_index]["Address"],"Source:",msg,"XDF mmedaddr:", XDF_mapaddr,
-             #"Hex bytes:", "Source:",hex_values[0], "Size:", hex_values[1], "Header Values:", headers, "Map values:", map_vals)
-
-    return out_def
-
-
-def merge_map_into_xdf(xdf_def, map_def, bindata):
+  # bin contents can be handed in by a caller that already read them
+  if bindata is None:
+    bindata = Path(bin_file).read_bytes()
+  with open(map_file, 'rb') as file:
+     map = json_loads(file.read())
+  print("# of Maps",len(map)-1,"Size of Bin FIle",len(bindata))
+  print("map table starting address:",map[0]["Address"])
+  for addr_index in range(1,len(map)):
+      addr=map[addr_index]["AddrInt"]
+      MapType=map[addr_index]["Type"]
+      hex_values=[]
+      if addr<0x2000:
+           if (len(bindata)==8192 and (addr>0x100) and MapType!="FixedMap"):
+              if len(bindata)==8192: fixaddr=addr
+              else: fixaddr=addr-4096
+              size=bindata[fixaddr+1]
+              raw_values = bindata[fixaddr:fixaddr+2*size+2]  # source, size, headers, values
+              #XDF_mapaddr = hex(addr+size+2)
+              XDF_mapaddr = hex(addr+size+2-4096)
+              hex_values=[_HEX[b] for b in raw_values]
+              headers  = hex_values[2:size+2]
+              map_vals = hex_values[size+2:size*2+2]
+              msg = _SRC_LABELS.get(raw_values[0], hex_values[0])
+           else:
+              if len(bindata)==8192: fixaddr=addr+4096
+              else: fixaddr=addr
+              raw_values = [_HEX[0], _HEX[0]]  #set address and size=0
+              hex_values = [_HEX[0], _HEX[0]]
+              XDF_mapaddr = hex(fixaddr)
+              size=0 # need to find the size from XDF and then extract from bin
+              headers=[]
+              map_vals=[] # need to find the size from XDF and then extract from bin
+              msg=_HEX[0]
+           #print("debug", XDF_mapaddr, fixaddr, len(bindata),MapType, "raw",raw_values[2:2*size+2],"hex",hex_values)
+
+           out = {
+                 "Addr"         :  map[addr_index]["Address"],
+                 "AddrInt"      :  addr,
+                 "MapType"      :  map[addr_index]["Type"],
+                 "Title"        :  map[addr_index]["Title"],
+                 "Source"       :  msg,
+                 "XDF mmedaddr" :  XDF_mapaddr,
+                 "Source"       :  hex_values[0],
+                 "Size"         :  hex_values[1],
+                 "Header Values": headers,
+                 "Map Values"   : map_vals
+                 }
+
+           out_def.append(out)
+           #print("Addr",map[addr_index]["Address"],"Source:",msg,"XDF mmedaddr:", XDF_mapaddr,
+           #"Hex bytes:", "Source:",hex_values[0], "Size:", hex_values[1], "Header Values:", headers, "Map values:", map_vals)
+
+  return out_def
+
+
+# Static fields of the axes added for maps missing from the XDF
+_AXIS_TEMPLATE = MappingProxyType({"ObjectType": "Axis", "Math": "X", "MathVarID": "X"})
+_Z_AXIS_TEMPLATE = MappingProxyType({
+    **_AXIS_TEMPLATE,
+    "Min": 0,
+    "Max": 255,
+    "IndexSizeBits": 8,
+    "DecimalPl": 0,
+    "Embedded.ElementSizeBits": 8,
+    "Embedded.MajorStrideBits": 0,
+    "Embedded.MinorStrideBits": 0,
+    "Embedded.Colcount": 1,
+})
+
+def _make_axes(table_id, title, addr, size, map_entry):
+    """x, y and z axis records for a table built from a map entry of `size` values."""
+    linkage = {"Parent": title, "Title": title, "ParentID": table_id, "Address": addr}
+    x_axis = {**_AXIS_TEMPLATE, "ID": "x", "UniqueID": "0x0", **linkage, "IndexCount": 1}
+    y_axis = {**_AXIS_TEMPLATE, "ID": "y", "UniqueID": "0x0", **linkage, "IndexCount": size}
+    z_axis = {
+        **_Z_AXIS_TEMPLATE,
+        "ID": "z",
+        **linkage,
+        "Embedded.Address": map_entry.get("XDF mmedaddr"),
+        "Embedded.Rowcount": size,
+        "Values": map_entry.get("Map Values"),
+        "Header": map_entry.get("Header Values"),
+        "Results": find_result_table(map_entry.get("Map Values"), map_entry.get("Math_Table")),
+    }
+    return x_axis, y_axis, z_axis
+
+def merge_map_into_xdf(xdf_def, map_def, map_index, bindata):
     axes = xdf_def.get("Axes")
     tables = xdf_def.get("Tables")
 
@@ -395,16 +512,19 @@ def merge_map_into_xdf(xdf_def, map_def, bindata):
         xdf_def["Tables"] = []
     tables = xdf_def["Tables"]
 
+    by_addr, by_addr_plus_4096 = map_index
+    z_by_addr = _build_z_index(axes)
 
     # === Pass 1: Merge existing maps ===
     for axis in axes:
         addr = axis.get("Embedded.Address")
         if addr is not None:
-            val = find_val(map_def, addr)
-            hdr = find_hdr(map_def, addr)
+            addr_int = int(addr,16)
+            val = find_val(by_addr, addr_int)
+            hdr = find_hdr(by_addr, addr_int)
             if ((val == None) or (val=="") or (val==[])):
-               val=find_val(map_def, int(addr,16)+4096)
-               hdr=find_hdr(map_def, int(addr,16)+4096)
+               val=find_val(by_addr_plus_4096, addr_int)
+               hdr=find_hdr(by_addr_plus_4096, addr_int)
             if ((val is not None) and (val !=[])):
                axis["Values"] = val
                axis["Header"] = hdr
@@ -417,25 +537,26 @@ def merge_map_into_xdf(xdf_def, map_def, bindata):
                    axis["Embedded.Colcount"]=1
                else: 
                     size=axis.get("Embedded.Rowcount")*axis.get("Embedded.Colcount")
-               val=lookup_val(bindata,hex(int(addr,16)+4096),size)
+               val=lookup_val(bindata,addr_int+4096,size)
                axis["Values"]=val
             axis["Results"]=find_result_table(val,axis.get("Math_Table"))
         axes_new.append(axis)
 # GO FIND MATCHES IN "EMBEDDEDDATA"
     # Scan map_def, add new records for any new maps NOT in XDF
+    existing_ids = {t.get("UniqueID") for t in tables}
     for map_entry in map_def:
         addr = map_entry.get("Addr")
         if addr is not None:
-           lookup=find_map_addr_in_xdf(xdf_def, addr)
+           lookup=find_map_addr_in_xdf(z_by_addr, map_entry["AddrInt"])
            if lookup != None:	
               print("Found Table in JSON Map file that already exists in XDF Map - Ignoring",map_entry.get("Title"),addr)
            else:
               print("Found variable tables in JSON Map but not in XDF - adding ",map_entry.get("Description"), "Base Address:",addr, "Map Value Address:",map_entry.get("XDF mmedaddr"))
-              size=find_size(xdf_def,map_entry.get("XDF mmedaddr"))
+              size=find_size(z_by_addr,int(map_entry.get("XDF mmedaddr"),16))
               size=map_entry.get("Size")
               description = "Extracted from BIN "+ addr
               title = map_entry.get("Title")
-              table_id=new_unique_table_id(xdf_def)
+              table_id=new_unique_table_id(existing_ids)
               new_table={
                     "Title": title,
                     "Description": description,
@@ -445,59 +566,8 @@ def merge_map_into_xdf(xdf_def, map_def, bindata):
                     "Flags": "0x0",
                     "CategoryMem":{} 
                         }
-              x_axis =  {
-                    "ObjectType": "Axis",
-                    "ID": "x",
-                    "UniqueID": "0x0",
-                    "Parent": title,
-                    #"Title": map_entry.get("Description"),
-                    "Title": title,
-                    "ParentID": table_id,
-                    "Address": addr,
-                    "Math":"X",
-                    "MathVarID":"X",
-                    "IndexCount":1,
-                        } 
-              y_axis =  {
-                    "ObjectType": "Axis",
-                    "ID": "y",
-                    "UniqueID": "0x0",
-                    "Parent": title,
-                    "Title": title,
-                    #"Title": map_entry.get("Description"),
-                    "ParentID": table_id,
-                    "Address": addr,
-                    "Math":"X",
-                    "MathVarID":"X",
-                    "IndexCount":int(size,16),
-                        } 
-                    
-              z_axis = {
-                    "ObjectType": "Axis",
-                    "ID": "z",
-                    #"UniqueID": "0x0",
-                    "Parent": title,
-                    "Title": title,
-                    #"Title": map_entry.get("Description"),
-                    "ParentID": table_id,
-                    "Address": addr,
-                    "Math": "X",
-                    "MathVarID":"X",
-                    "Min": 0,
-                    "Max": 255,
-                    "IndexSizeBits": 8,
-                    "DecimalPl": 0,
-                    "Embedded.ElementSizeBits":8,
-                    "Embedded.MajorStrideBits":0,
-                    "Embedded.MinorStrideBits":0,
-                    "Embedded.Address": map_entry.get("XDF mmedaddr"),
-                    "Embedded.Colcount": 1,
-                    "Embedded.Rowcount": int(size,16),
-                    "Values": map_entry.get("Map Values"),
-                    "Header": map_entry.get("Header Values"),
-                    "Results": find_result_table(map_entry.get("Map Values"),map_entry.get("Math_Table"))
-                       }
-           
+              x_axis, y_axis, z_axis = _make_axes(table_id, title, addr, int(size,16), map_entry)
+
               tables.append(new_table)
               axes_new.append(x_axis)
               axes_new.append(y_axis)
@@ -514,226 +584,277 @@ def merge_map_into_xdf(xdf_def, map_def, bindata):
 # Parser
 # ---------------------------
 class XDFParser:
-    def __init__(self, filepath):
+    def __init__(self, filepath, json_file=None):
         self.filepath = Path(filepath)
         if not self.filepath.exists():
             raise FileNotFoundError(f"File not found: {self.filepath}")
-        self.tree = ET.parse(self.filepath)
-        self.root = self.tree.getroot()
-        self.json_rows = []  # flattened JSON entries
+        # flattened JSON entries are streamed to this workbook as they are parsed
+        self.json_file = json_file
+        self._json_wb = None
+        self._json_ws = None
+        self._json_row = 0
+
+    def _json_sheet(self):
+        """Open the JSON workbook on first use and write its header row."""
+        if self._json_ws is None:
+            self._json_wb = xlsxwriter.Workbook(str(self.json_file), {"constant_memory": True})
+            self._json_ws = self._json_wb.add_worksheet("JSON")
+            self._json_ws.write_row(0, 0, _JSON_COLUMNS)
+            self._json_row = 1
+        return self._json_ws
 
     def add_json_entries(self, object_type, name, parent, field_name, value):
-        """Flatten dict/list values into rows for the JSON export."""
+        """Flatten dict/list values into rows of the JSON export."""
         if isinstance(value, dict):
-            for k, v in value.items():
-                self.json_rows.append({
-                    "ObjectType": object_type,
-                    "Title": name,
-                    "Parent": parent,
-                    "Field": field_name,
-                    "Key": k,
-                    "Value": v,
-                })
+            items = value.items()
         elif isinstance(value, list):
-            for i, v in enumerate(value):
-                self.json_rows.append({
-                    "ObjectType": object_type,
-                    "Title": name,
-                    "Parent": parent,
-                    "Field": field_name,
-                    "Key": i,
-                    "Value": v,
-                })
-
-    def parse(self,map_def):
-        xdf_def = {
-            "Header": [],
-            "Tables": [],
-            "Scalars": [],
-            "Constants": [],
-            "Axes": [],
+            items = enumerate(value)
+        else:
+            return
+        if self.json_file is None:
+            return
+        ws = self._json_sheet()
+        for k, v in items:
+            ws.write_row(self._json_row, 0, (object_type, name, parent, field_name, k, v))
+            self._json_row += 1
+
+    def parse(self,map_index):
+        header, tables, scalars, constants, axes = [], [], [], [], []
+        add_header, add_table, add_scalar, add_constant, add_axis = (
+            header.append, tables.append, scalars.append, constants.append, axes.append)
+        # Top-level objects and what to do with each one
+        handlers = {
+            "XDFHEADER":   lambda e: add_header(self._parse_header(e)),
+            "XDFTABLE":    lambda e: self._emit_table(e, add_table, add_axis, map_index),
+            "XDFSCALAR":   lambda e: add_scalar(self._parse_scalar(e)),
+            "XDFCONSTANT": lambda e: add_constant(self._parse_constant(e)),
+        }
+        # Single streaming pass: each top-level object is built on its end
+        # event, then cleared (with its already-processed siblings) so the
+        # full DOM is never held in memory.
+        context = ET.iterparse(str(self.filepath), events=("end",), tag=tuple(handlers),
+                               huge_tree=True, remove_blank_text=True)
+        for event, elem in context:
+            handlers[elem.tag](elem)
+
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+
+        return {
+            "Header": header,
+            "Tables": tables,
+            "Scalars": scalars,
+            "Constants": constants,
+            "Axes": axes,
         }
-        #HEADER
-        for h in self.root.findall(".//XDFHEADER"):
-           cats = {cat.get("index"): cat.get("name") for cat in h.findall("CATEGORY") if cat.get("index")}
-           bo=_extract_base_offset(h)
-           defs=_extract_defaults(h)
-           regs=_extract_region(h)
-           hdr = {
-               "ObjectType"  : "Header",
-               "Flags"       : h.findtext("flags"),
-               "FileVersion" : h.findtext("fileversion"),
-               "DefTitle"    : h.findtext("deftitle"),
-               "Description" : h.findtext("description"),
-               "Author"      : h.findtext("author"),
-               "BaseOffset"  : bo,
-               "Defaults"    : defs,
-               "Region"      : regs,
-               "Category"  : serialize_field(cats)
-                 }
-           xdf_def["Header"].append(hdr)
- 
-        # Tables
-        for t in self.root.findall(".//XDFTABLE"):
-            embedded = _extract_embedded(t)
-            raw_unit, norm_unit = normalize_unittype(t.findtext("unittype"))
-            raw_out, norm_out = normalize_outputtype(t.findtext("outputtype"))
-            catmems = {cat.get("index"): cat.get("category") for cat in t.findall("CATEGORYMEM") if cat.get("index")}
-            tbl = {
-                "ObjectType": "Table",
-                "Title": t.findtext("title", "Unnamed Table"),
-                #"UniqueID": t.get("uniqueid", "unknown"),
-                "UniqueID": t.get("uniqueid"),
-                "Flags": t.findtext("flags", "0x0"),
-                "Description": t.findtext("description"),
-                "CategoryMem":catmems
-            }
-            xdf_def["Tables"].append(tbl)
-
-            # Axes
-            for ax in t.findall(".//XDFAXIS"):
-                embedded_ax = _extract_embedded(ax)
-                raw_unit_ax, norm_unit_ax = normalize_unittype(ax.findtext("unittype"))
-                raw_out_ax, norm_out_ax = normalize_outputtype(ax.findtext("outputtype"))
-
-                labels = {int(lbl.get("index")): lbl.get("value") for lbl in ax.findall("LABEL") if lbl.get("index")}
-                dalinks = [d.get("index") for d in ax.findall("DALINK") if d.get("index")]
-
-                if embedded_ax.get("mmedaddress") is not None:
-                  addr_str = hex(embedded_ax["mmedaddress"])
-                  if embedded_ax["mmedcolcount"] is None:
-                      columns = 1
-                  else:
-                      columns = embedded_ax.get("mmedcolcount", 1)
-                else:
-                  addr_str = None
-                  columns=None
-
-                vals=find_val(map_def,embedded_ax["mmedaddress"])
-                hdrs=find_hdr(map_def,embedded_ax["mmedaddress"])
-                math = _extract_math(ax)
-                math_table = _extract_math_table(ax)
-
-                axis = {
-                    "ObjectType": "Axis",
-                    "ID": ax.get("id", "unknown"),
-                    "UniqueID": ax.get("uniqueid"),
-                    #"UniqueID": ax.get("uniqueid", "unknown"),
-                    "Parent": t.findtext("title"),
-                    "Title": ax.findtext("title"),
-                    "ParentID": t.get("uniqueid","No Parent"),
-                    "Address": ax.findtext("address"),
-                    "Units": ax.findtext("units"),
-                    "UnitType": ax.findtext("unittype"),
-                    "OutputType": ax.findtext("outputtype"),
-                    "IndexCount": ax.findtext("indexcount"),
-                    "Math_Table": _extract_math_table(ax),
-                #    "MathVarID": _extract_varid(ax),
-                    "Min": ax.findtext("min"),
-                    "Max": ax.findtext("max"),
-                    "IndexSizeBits": ax.findtext("indexsizebits"),
-                    "DecimalPl": ax.findtext("decimalpl"),
-                    "DataType": ax.findtext("datatype"),
-                    "Embedded.ElementSizeBits": embedded_ax["mmedelementsizebits"],
-                    "Embedded.MajorStrideBits": embedded_ax["mmedmajorstridebits"],
-                    "Embedded.MinorStrideBits": embedded_ax["mmedminorstridebits"],
-                    "Embedded.Address": addr_str,
-                    "Embedded.Rowcount": embedded_ax["mmedrowcount"],
-                    "Embedded.Colcount": columns,
-                    "Embedded.TypeFlags": embedded_ax["mmedtypeflags"],
-                    "Labels": serialize_field(labels),
-                    "DALINK": serialize_field(dalinks),
-                    }
-                xdf_def["Axes"].append(axis)
 
-                if labels:
-                    self.add_json_entries("Axis", axis["ID"], axis["Parent"], "Labels", labels)
-                if dalinks:
-                    self.add_json_entries("Axis", axis["ID"], axis["Parent"], "DALINK", dalinks)
-
-        # Scalars
-        for s in self.root.findall(".//XDFSCALAR"):
-            embedded = _extract_embedded(s)
-            raw_unit, norm_unit = normalize_unittype(s.findtext("unittype"))
-            raw_out, norm_out = normalize_outputtype(s.findtext("outputtype"))
-            scalar = {
-                "ObjectType": "Scalar",
-                "UniqueID": s.get("uniqueid"),
-                "Title": s.findtext("title", "Unnamed Scalar"),
-                "Address": s.findtext("address"),
-                "Datatype": s.findtext("datatype"),
-                "Description": s.findtext("description"),
-                "Units": s.findtext("units"),
-                "UnitType": s.findtext("unittype"),
-                "OutputType": s.findtext("outputtype"),
-                "Math_Table": _extract_math_table(s),
-                "Embedded.ElementSizeBits": embedded["mmedelementsizebits"],
-                "Embedded.MajorStrideBits": embedded["mmedmajorstridebits"],
-                "Embedded.MinorStrideBits": embedded["mmedminorstridebits"],
-                "Embedded.Address": embedded_ax["mmedaddress"],
-                "Labels": None,
-                "DALINK": None,
-                "Parent": None,
-                "Size": None,
-                "Value":0,
-            }
-            xdf_def["Scalars"].append(scalar)
-
-        # Constants
-        for c in self.root.findall(".//XDFCONSTANT"):
-            embedded = _extract_embedded(c)
-            raw_unit, norm_unit = normalize_unittype(c.findtext("unittype"))
-            raw_out, norm_out = normalize_outputtype(c.findtext("outputtype"))
-            const = {
-                "UniqueID": c.get("uniqueid"),
-                "ObjectType": "Constant",
-                "Title": c.findtext("title", "Unnamed Constant"),
-                "Address": c.findtext("address"),
-                "Datatype": c.findtext("datatype"),
-                "Description": c.findtext("description"),
-                "Units": c.findtext("units"),
-                "UnitType": c.findtext("unittype"),
-                "OutputType": c.findtext("outputtype"),
-                "Math_Table": _extract_math_table(c),
-                "Embedded.ElementSizeBits": embedded["mmedelementsizebits"],
-                "Embedded.MajorStrideBits": embedded["mmedmajorstridebits"],
-                "Embedded.MinorStrideBits": embedded["mmedminorstridebits"],
-                "Embedded.Address": embedded_ax["mmedaddress"],
-                "Labels": None,
-                "DALINK": None,
-                "Parent": None,
-                "Size": "1",
-                "Value":0,
+    def _emit_table(self, t, add_table, add_axis, map_index):
+        add_table(self._parse_table(t))
+        # Axes
+        parent_title = t.findtext("title")
+        parent_id = t.get("uniqueid","No Parent")
+        for ax in _XP_AXES(t):
+            add_axis(self._parse_axis(ax, parent_title, parent_id, map_index))
+
+    def _parse_header(self, h):
+        h_text, _ = _children(h)
+        cats = {cat.get("index"): cat.get("name") for cat in _XP_CATEGORIES(h) if cat.get("index")}
+        bo=_extract_base_offset(h)
+        defs=_extract_defaults(h)
+        regs=_extract_region(h)
+        hdr = {
+            "ObjectType"  : "Header",
+            "Flags"       : h_text.get("flags"),
+            "FileVersion" : h_text.get("fileversion"),
+            "DefTitle"    : h_text.get("deftitle"),
+            "Description" : h_text.get("description"),
+            "Author"      : h_text.get("author"),
+            "BaseOffset"  : bo,
+            "Defaults"    : defs,
+            "Region"      : regs,
+            "Category"  : cats
+              }
+        return hdr
+
+    def _parse_table(self, t):
+        t_text, t_ed = _children(t)
+        embedded = _extract_embedded(t_ed)
+        raw_unit, norm_unit = normalize_unittype(t_text.get("unittype"))
+        raw_out, norm_out = normalize_outputtype(t_text.get("outputtype"))
+        catmems = {cat.get("index"): cat.get("category") for cat in _XP_CATEGORYMEMS(t) if cat.get("index")}
+        tbl = {
+            "ObjectType": "Table",
+            "Title": t_text.get("title", "Unnamed Table"),
+            #"UniqueID": t.get("uniqueid", "unknown"),
+            "UniqueID": t.get("uniqueid"),
+            "Flags": t_text.get("flags", "0x0"),
+            "Description": t_text.get("description"),
+            "CategoryMem":catmems
+        }
+        return tbl
+
+    def _parse_axis(self, ax, parent_title, parent_id, map_index):
+        ax_text, ax_ed = _children(ax)
+        embedded_ax = _extract_embedded(ax_ed)
+        raw_unit_ax, norm_unit_ax = normalize_unittype(ax_text.get("unittype"))
+        raw_out_ax, norm_out_ax = normalize_outputtype(ax_text.get("outputtype"))
+
+        labels = {int(lbl.get("index")): lbl.get("value") for lbl in _XP_LABELS(ax) if lbl.get("index")}
+        dalinks = [d.get("index") for d in _XP_DALINKS(ax) if d.get("index")]
+
+        if embedded_ax.address is not None:
+          addr_str = hex(embedded_ax.address)
+          if embedded_ax.col_count is None:
+              columns = 1
+          else:
+              columns = embedded_ax.col_count
+        else:
+          addr_str = None
+          columns=None
+
+        by_addr = map_index[0]
+        vals=find_val(by_addr,embedded_ax.address)
+        hdrs=find_hdr(by_addr,embedded_ax.address)
+        var_id, math, math_table = _extract_all_math(ax)
+
+        axis = {
+            "ObjectType": "Axis",
+            "ID": ax.get("id", "unknown"),
+            "UniqueID": ax.get("uniqueid"),
+            #"UniqueID": ax.get("uniqueid", "unknown"),
+            "Parent": parent_title,
+            "Title": ax_text.get("title"),
+            "ParentID": parent_id,
+            "Address": ax_text.get("address"),
+            "Units": ax_text.get("units"),
+            "UnitType": ax_text.get("unittype"),
+            "OutputType": ax_text.get("outputtype"),
+            "IndexCount": ax_text.get("indexcount"),
+            "Math_Table": math_table,
+        #    "MathVarID": var_id,
+            "Min": ax_text.get("min"),
+            "Max": ax_text.get("max"),
+            "IndexSizeBits": ax_text.get("indexsizebits"),
+            "DecimalPl": ax_text.get("decimalpl"),
+            "DataType": ax_text.get("datatype"),
+            "Embedded.ElementSizeBits": embedded_ax.element_size_bits,
+            "Embedded.MajorStrideBits": embedded_ax.major_stride_bits,
+            "Embedded.MinorStrideBits": embedded_ax.minor_stride_bits,
+            "Embedded.Address": addr_str,
+            "Embedded.Rowcount": embedded_ax.row_count,
+            "Embedded.Colcount": columns,
+            "Embedded.TypeFlags": embedded_ax.type_flags,
+            "Labels": labels,
+            "DALINK": dalinks,
             }
-            if dalinks:
-                    self.add_json_entries("Constant", const["Title"], const["Parent"], "DALINK", dalinks)
-
-            xdf_def["Constants"].append(const)
 
-        return xdf_def
+        if labels:
+            self.add_json_entries("Axis", axis["ID"], axis["Parent"], "Labels", labels)
+        if dalinks:
+            self.add_json_entries("Axis", axis["ID"], axis["Parent"], "DALINK", dalinks)
+        return axis
+
+    def _parse_scalar(self, s):
+        s_text, s_ed = _children(s)
+        embedded = _extract_embedded(s_ed)
+        raw_unit, norm_unit = normalize_unittype(s_text.get("unittype"))
+        raw_out, norm_out = normalize_outputtype(s_text.get("outputtype"))
+        scalar = {
+            "ObjectType": "Scalar",
+            "UniqueID": s.get("uniqueid"),
+            "Title": s_text.get("title", "Unnamed Scalar"),
+            "Address": s_text.get("address"),
+            "Datatype": s_text.get("datatype"),
+            "Description": s_text.get("description"),
+            "Units": s_text.get("units"),
+            "UnitType": s_text.get("unittype"),
+            "OutputType": s_text.get("outputtype"),
+            "Math_Table": _extract_all_math(s)[2],
+            "Embedded.ElementSizeBits": embedded.element_size_bits,
+            "Embedded.MajorStrideBits": embedded.major_stride_bits,
+            "Embedded.MinorStrideBits": embedded.minor_stride_bits,
+            "Embedded.Address": embedded.address,
+            "Labels": None,
+            "DALINK": None,
+            "Parent": None,
+            "Size": None,
+            "Value":0,
+        }
+        return scalar
+
+    def _parse_constant(self, c):
+        c_text, c_ed = _children(c)
+        embedded = _extract_embedded(c_ed)
+        raw_unit, norm_unit = normalize_unittype(c_text.get("unittype"))
+        raw_out, norm_out = normalize_outputtype(c_text.get("outputtype"))
+        dalinks = [d.get("index") for d in _XP_DALINKS(c) if d.get("index")]
+        const = {
+            "UniqueID": c.get("uniqueid"),
+            "ObjectType": "Constant",
+            "Title": c_text.get("title", "Unnamed Constant"),
+            "Address": c_text.get("address"),
+            "Datatype": c_text.get("datatype"),
+            "Description": c_text.get("description"),
+            "Units": c_text.get("units"),
+            "UnitType": c_text.get("unittype"),
+            "OutputType": c_text.get("outputtype"),
+            "Math_Table": _extract_all_math(c)[2],
+            "Embedded.ElementSizeBits": embedded.element_size_bits,
+            "Embedded.MajorStrideBits": embedded.major_stride_bits,
+            "Embedded.MinorStrideBits": embedded.minor_stride_bits,
+            "Embedded.Address": embedded.address,
+            "Labels": None,
+            "DALINK": None,
+            "Parent": None,
+            "Size": "1",
+            "Value":0,
+        }
+        if dalinks:
+                self.add_json_entries("Constant", const["Title"], const["Parent"], "DALINK", dalinks)
 
-    def to_excel(self, xdf_def, output_file):
-        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
-            workbook = writer.book
+        return const
 
+    @staticmethod
+    def to_excel(xdf_def, output_file):
+        # Static so it can run in a worker process: the parser holds the open JSON workbook
+        with xlsxwriter.Workbook(output_file, _EXCEL_OPTIONS) as workbook:
             def write_sheet(name, rows, cols=None):
                 if not rows:
                     return
-                df = pd.DataFrame(rows)
-                if cols:
-                    df = df[cols]
-                df.to_excel(writer, sheet_name=name, index=False)
-
-                # Wrap + row height adjust for JSON columns
-                worksheet = writer.sheets[name]
+                # No schema given: every key seen, in first-seen order
+                if not cols:
+                    cols = list(dict.fromkeys(k for row in rows for k in row))
+                worksheet = workbook.add_worksheet(name)
+                # JSON text for the serialized fields, built once for both passes below
+                json_text = {c: [serialize_field(row.get(c)) for row in rows]
+                             for c in cols if c in _JSON_TEXT_COLUMNS}
+
+                # Wrap + row height for JSON columns, worked out before any row is
+                # written since constant_memory can't go back to a flushed row
                 wrap_fmt = workbook.add_format({'text_wrap': True, 'valign': 'top'})
-                for col_idx, col_name in enumerate(df.columns):
-                    if any(isinstance(v, str) and "\n" in v for v in df[col_name].dropna()):
+                row_nl = [0] * len(rows)
+                for col_idx, col_name in enumerate(cols):
+                    if col_name not in _WRAP_COLUMNS:
+                        continue
+                    values = json_text[col_name] if col_name in json_text else (row.get(col_name) for row in rows)
+                    # One scan per cell; only rows that actually have newlines are touched
+                    wrapped = False
+                    for i, v in enumerate(values):
+                        if isinstance(v, str) and (n := v.count("\n")):
+                            row_nl[i] = n
+                            wrapped = True
+                    if wrapped:
                         worksheet.set_column(col_idx, col_idx, 50, wrap_fmt)
-                        for row_idx, val in enumerate(df[col_name], start=1):
-                            if isinstance(val, str) and "\n" in val:
-                                line_count = val.count("\n") + 1
-                                worksheet.set_row(row_idx, 15 * line_count)
+
+                # Rows go out in order, straight from the dicts to xlsxwriter
+                # Header row left unformatted, as the installed pandas' to_excel writes it
+                worksheet.write_row(0, 0, cols)
+                for i, row in enumerate(rows, 1):
+                    if row_nl[i - 1]:
+                        worksheet.set_row(i, 15 * (row_nl[i - 1] + 1))
+                    worksheet.write_row(i, 0, [excel_cell(json_text[c][i - 1] if c in json_text else row.get(c))
+                                               for c in cols])
 
             # Clean per-sheet schemas
             write_sheet("Header", xdf_def["Header"], [
@@ -764,18 +885,17 @@ class XDFParser:
             # EmbeddedData: keep full superset for auditing
             write_sheet("EmbeddedData", xdf_def["EmbeddedData"])
 
-    def to_json_excel(self, output_file):
-        if not self.json_rows:
+    def to_json_excel(self):
+        """Finish the streamed JSON workbook; nothing is written if there were no entries."""
+        if self._json_wb is None:
             return
-        df_json = pd.DataFrame(self.json_rows)
-        with pd.ExcelWriter(output_file, engine="xlsxwriter") as writer:
-            df_json.to_excel(writer, sheet_name="JSON", index=False)
+        self._json_wb.close()
 
     def to_embedded_json(self, xdf_def, output_file):
         if not xdf_def.get("EmbeddedData"):
             return
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(xdf_def["EmbeddedData"], f, ensure_ascii=False, indent=2)
+        with open(output_file, "wb") as f:
+            f.write(json_dumps(xdf_def["EmbeddedData"]))
 
 def create_embedded(xdf):
     embed = {"EmbeddedData": []}
@@ -783,16 +903,31 @@ def create_embedded(xdf):
     # Add Tables, Axes, Constants, and Scalars if present
     for key in ("Header","Tables", "Axes", "Constants", "Scalars"):
         if key in xdf and isinstance(xdf[key], list):
-            embed["EmbeddedData"].extend(xdf[key].copy())
+            embed["EmbeddedData"].extend(xdf[key])
         elif key in xdf and isinstance(xdf[key], dict):
-            embed["EmbeddedData"].append(xdf[key].copy())
+            embed["EmbeddedData"].append(xdf[key])
 
     return embed
 
+# Axis fields written as plain text children, with their XDF tag
+_AXIS_TEXT_TAGS = tuple((tag, tag.lower()) for tag in
+                        ("Units","IndexCount","DecimalPl","Min","Max","OutputType","DataType","UnitType"))
+
+# Header fields written as plain text children: (XDF tag, JSON key, default)
+_HEADER_TEXT_FIELDS = (
+    ("flags", "Flags", "0x0"),
+    ("fileversion", "FileVersion", ""),
+    ("deftitle", "DefTitle", ""),
+    ("description", "Description", ""),
+    ("author", "Author", ""),
+)
+
 def json_to_xdf(json_path, xdf_path):
     # Load JSON
-    with open(json_path, "r") as f:
-        data = json.load(f)
+    with open(json_path, "rb") as f:
+        data = json_loads(f.read())
+
+    SubElement = ET.SubElement
 
     xdf = ET.Element("XDFORMAT", attrib={
         "version": "1.80",
@@ -802,29 +937,26 @@ def json_to_xdf(json_path, xdf_path):
     #header_data = next((item for item in data if item.get("ObjectType") == "Header"), None)
     header_data = data[0]
     if header_data:
-      hdr = ET.SubElement(xdf, "XDFHEADER")
+      hdr = SubElement(xdf, "XDFHEADER")
 
-      ET.SubElement(hdr, "flags").text = str(header_data.get("Flags", "0x0"))
-      ET.SubElement(hdr, "fileversion").text = str(header_data.get("FileVersion", ""))
-      ET.SubElement(hdr, "deftitle").text = str(header_data.get("DefTitle", ""))
-      ET.SubElement(hdr, "description").text = str(header_data.get("Description", ""))
-      ET.SubElement(hdr, "author").text = str(header_data.get("Author", ""))
+      for xml_tag, key, default in _HEADER_TEXT_FIELDS:
+          SubElement(hdr, xml_tag).text = str(header_data.get(key, default))
 
       # Base offset
 
       base = header_data.get("BaseOffset", {})
-      ET.SubElement(hdr, "baseoffset").text=str(base.get("offset",""))
-      ET.SubElement(hdr, "subtract").text=str(base.get("subtract",""))
+      SubElement(hdr, "baseoffset").text=str(base.get("offset",""))
+      SubElement(hdr, "subtract").text=str(base.get("subtract",""))
 
       # Defaults
       defaults = header_data.get("Defaults", {})
-      ET.SubElement(hdr, "DEFAULTS", attrib={
+      SubElement(hdr, "DEFAULTS", attrib={
             k: str(v) for k, v in defaults.items()
       })
 
       # Region
       region = header_data.get("Region", {})
-      ET.SubElement(hdr, "REGION", attrib={
+      SubElement(hdr, "REGION", attrib={
           k: str(v) for k, v in region.items()
       })
 
@@ -832,21 +964,21 @@ def json_to_xdf(json_path, xdf_path):
       categories = header_data.get("Category", [])
       if isinstance(categories, list):
             for cat in categories:
-                ET.SubElement(hdr, "CATEGORY", attrib={
+                SubElement(hdr, "CATEGORY", attrib={
                     "index": str(cat.get("index", "")),
                     "name": str(cat.get("name", ""))
                 })
       elif isinstance(categories, dict):
             for idx, name in categories.items():
-                ET.SubElement(hdr, "CATEGORY", attrib={
+                SubElement(hdr, "CATEGORY", attrib={
                     "index": str(idx),
                     "name": str(name)
                 })
       else:
             try:
-                parsed = json.loads(categories)
+                parsed = json_loads(categories)
                 for idx, name in parsed.items():
-                    ET.SubElement(hdr, "CATEGORY", attrib={
+                    SubElement(hdr, "CATEGORY", attrib={
                         "index": str(idx),
                         "name": str(name)
                     })
@@ -854,56 +986,68 @@ def json_to_xdf(json_path, xdf_path):
                 pass
 
 
+    # Axes grouped by parent table, in file order
+    axes_by_parent = {}
+    for a in data:
+        axes_by_parent.setdefault(a.get("ParentID"), []).append(a)
+
     # Create TABLES section
     for item in data[1:]:
-        if item.get("ObjectType") == "Table":
+        get = item.get
+        if get("ObjectType") == "Table":
 
-            table = ET.SubElement(xdf, "XDFTABLE", attrib={
-                "uniqueid": str(item.get("UniqueID", "0x0")),
-                "flags": str(item.get("Flags", "0x0"))
+            table = SubElement(xdf, "XDFTABLE", attrib={
+                "uniqueid": str(get("UniqueID", "0x0")),
+                "flags": str(get("Flags", "0x0"))
             })
-            ET.SubElement(table, "title").text = item.get("Title", "")
-            ET.SubElement(table, "description").text = item.get("Description", "")
-            if item.get("CategoryMem"):
+            SubElement(table, "title").text = get("Title", "")
+            SubElement(table, "description").text = get("Description", "")
+            if get("CategoryMem"):
                 #catmems = json.loads(item["CategoryMem"])
                 catmems = item["CategoryMem"]
                 for idx, catmem in catmems.items():
-                    ET.SubElement(table, "categorymem", attrib={"index": idx, "category": catmem})
+                    SubElement(table, "categorymem", attrib={"index": idx, "category": catmem})
 
 
 
             # Find axes for this table
-            for axis in [a for a in data if a.get("ParentID") == item.get("UniqueID")]:
-                ax_elem = ET.SubElement(table, "XDFAXIS", attrib={
-                    "id": axis.get("ID", ""),
-                    "uniqueid": str(axis.get("UniqueID", "0x0"))
+            for axis in axes_by_parent.get(get("UniqueID"), []):
+                ax_get = axis.get
+                ax_elem = SubElement(table, "XDFAXIS", attrib={
+                    "id": ax_get("ID", ""),
+                    "uniqueid": str(ax_get("UniqueID", "0x0"))
                 })
-                emb = ET.SubElement(ax_elem, "EMBEDDEDDATA", attrib={
-                    "mmedaddress": str(axis.get("Embedded.Address", "")),
-                    "mmedelementsizebits": str(axis.get("Embedded.ElementSizeBits", "")),
-                    "mmedmajorstridebits": str(axis.get("Embedded.MajorStrideBits", "")),
-                    "mmedminorstridebits": str(axis.get("Embedded.MinorStrideBits", "")),
-                    "mmedrowcount": str(axis.get("Embedded.Rowcount", "")),
-                    "mmedcolcount": str(axis.get("Embedded.Colcount", ""))
+                emb = SubElement(ax_elem, "EMBEDDEDDATA", attrib={
+                    "mmedaddress": str(ax_get("Embedded.Address", "")),
+                    "mmedelementsizebits": str(ax_get("Embedded.ElementSizeBits", "")),
+                    "mmedmajorstridebits": str(ax_get("Embedded.MajorStrideBits", "")),
+                    "mmedminorstridebits": str(ax_get("Embedded.MinorStrideBits", "")),
+                    "mmedrowcount": str(ax_get("Embedded.Rowcount", "")),
+                    "mmedcolcount": str(ax_get("Embedded.Colcount", ""))
                 })
 
                 # Write decimal/min/max/etc.
-                for tag in ["Units","IndexCount","DecimalPl","Min","Max","OutputType", "DataType","UnitType"]:
-                    if axis.get(tag):
-                        ET.SubElement(ax_elem, tag.lower()).text = str(axis[tag])
+                for tag, xml_tag in _AXIS_TEXT_TAGS:
+                    if ax_get(tag):
+                        SubElement(ax_elem, xml_tag).text = str(axis[tag])
 
-                if axis.get("DALINK"):
-                    dalinks = json.loads(axis["DALINK"])
+                # Older embedded.json files carry DALINK/Labels as JSON strings, like Category
+                dalinks = ax_get("DALINK")
+                if dalinks:
+                    if isinstance(dalinks, str):
+                        dalinks = json_loads(dalinks)
                     for idx in dalinks:
-                        ET.SubElement(ax_elem, "DALINK", attrib={"index": idx})
+                        SubElement(ax_elem, "DALINK", attrib={"index": idx})
 
-                if axis.get("Labels"):
-                    labels = json.loads(axis["Labels"])
+                labels = ax_get("Labels")
+                if labels:
+                    if isinstance(labels, str):
+                        labels = json_loads(labels)
                     for idx, label in labels.items():
-                        ET.SubElement(ax_elem, "LABEL", attrib={"index": idx, "value": label})
+                        SubElement(ax_elem, "LABEL", attrib={"index": idx, "value": label})
 
-                if axis.get("Math_Table"):
-                     math_table=axis.get("Math_Table")
+                if ax_get("Math_Table"):
+                     math_table=ax_get("Math_Table")
 
                      for entry in math_table:
                        attrs = {}
@@ -915,20 +1059,15 @@ def json_to_xdf(json_path, xdf_path):
                            attrs["equation"] = entry["equation"]
              
                        # Create <MATH> element
-                       math_elem = ET.SubElement(ax_elem, "MATH", attrib=attrs)
+                       math_elem = SubElement(ax_elem, "MATH", attrib=attrs)
              
                        # Create nested <VAR id="..."/> element
                        if entry.get("var"):
-                           ET.SubElement(math_elem, "VAR", attrib={"id": entry["var"]})
-             
-             
-             
-             
-             
-                # Write XML to file
-                tree = ET.ElementTree(xdf)
-    ET.indent(tree, space="  ", level=0)
-    tree.write(xdf_path, encoding="utf-8", xml_declaration=True)
+                           SubElement(math_elem, "VAR", attrib={"id": entry["var"]})
+
+    # Write XML to file; lxml indents while serializing, no separate indent pass
+    tree = ET.ElementTree(xdf)
+    tree.write(xdf_path, encoding="utf-8", xml_declaration=True, pretty_print=True)
 
 
 # ---------------------------
@@ -950,6 +1089,7 @@ def main():
     bin_file = Path(sys.argv[3])
     if not bin_file.exists():
        raise FileNotFoundError(f".bin File not found: {bin_file}")
+    bindata = bin_file.read_bytes()
 
     data=extract_values_from_bin(input_map_file)
 
@@ -962,10 +1102,7 @@ def main():
 
     json_map_file_name = outdirname+"/"+basename+".map.json"
 
-    with open(json_map_file_name, 'w') as json_file:
-        json.dump(data, json_file, indent=4)
-
-    json_file.close()
+    Path(json_map_file_name).write_bytes(json_dumps(data))
 
     print("# of Maps",len(data)-1)
     print("Start address of map",data[0]["Address"])
@@ -976,11 +1113,10 @@ def main():
 
     print(f"All JSON Maps, Values and Headers written to {out_all_maps_file}")
 
-    out_def = merge_data(bin_file, json_map_file_name)
+    out_def = merge_data(bin_file, json_map_file_name, bindata)
 
-    with open(out_all_maps_file, "w", encoding="utf-8") as f:
-            json.dump(out_def, f, ensure_ascii=False, indent=2)
-    f.close()
+    with open(out_all_maps_file, "wb") as f:
+        json_dump_array(out_def, f)
 
 
     map_file = out_all_maps_file
@@ -989,42 +1125,44 @@ def main():
     #if not map_file.exists():
     #    raise FileNotFoundError(f"Map File not found: {map_file}")
 
-    with open(bin_file, "rb") as f:
-        bindata = f.read()
-
     #Read Extacted Bin maps from JSON
     map_def=ReadJSONMap(map_file)
+    map_index=_build_map_index(map_def)
     
-    # Read XDF
-    parser = XDFParser(infile)
-    xdf_def = parser.parse(map_def)
+    # Read XDF, streaming the flattened JSON breakdown as it goes
+    outfile_json = outdirname+"/"+basename+".json.xlsx"
+    parser = XDFParser(infile, outfile_json)
+    xdf_def = parser.parse(map_index)
 
     #Merge bin content maps into xdf_def struct
-    xdf_def_merge = merge_map_into_xdf(xdf_def, map_def,bindata)
+    xdf_def_merge = merge_map_into_xdf(xdf_def, map_def, map_index, bindata)
 
     embed=create_embedded (xdf_def_merge)
 
     xdf_def_merge["EmbeddedData"]=embed["EmbeddedData"]
    
-    # Main workbook
+    # Main workbook is the slowest write; it runs in a worker while the
+    # remaining outputs are written here
     outfile_main = outdirname+"/"+basename+".parsed.xlsx"
-    parser.to_excel(xdf_def_merge, outfile_main)
-    print(f"Exported main workbook: {outfile_main}")
+    with ProcessPoolExecutor(max_workers=1) as ex:
+        main_book = ex.submit(XDFParser.to_excel, xdf_def_merge, outfile_main)
 
-    # JSON workbook
-    outfile_json = outdirname+"/"+basename+".json.xlsx"
-    parser.to_json_excel(outfile_json)
-    print(f"Exported JSON breakdown: {outfile_json}")
-
-    # Embedded JSON
-    outfile_embedded_json = outdirname+"/"+basename+"embedded.json"
-    parser.to_embedded_json(xdf_def_merge, outfile_embedded_json)
-    print(f"Exported EmbeddedData JSON: {outfile_embedded_json}")
-
-    # Merged XDF 
-    outfile_merged_xdf = outxdfdirname+"/"+basename+".merged.xdf"
-    json_to_xdf(outfile_embedded_json,outfile_merged_xdf)
-    print(f"XDF file written to {outfile_merged_xdf}")
+        # JSON workbook
+        parser.to_json_excel()
+        print(f"Exported JSON breakdown: {outfile_json}")
+
+        # Embedded JSON
+        outfile_embedded_json = outdirname+"/"+basename+"embedded.json"
+        parser.to_embedded_json(xdf_def_merge, outfile_embedded_json)
+        print(f"Exported EmbeddedData JSON: {outfile_embedded_json}")
+
+        # Merged XDF, built from embedded.json
+        outfile_merged_xdf = outxdfdirname+"/"+basename+".merged.xdf"
+        json_to_xdf(outfile_embedded_json,outfile_merged_xdf)
+        print(f"XDF file written to {outfile_merged_xdf}")
+
+        main_book.result()
+        print(f"Exported main workbook: {outfile_main}")
     
 if __name__ == "__main__":
     main()